@@ -7,6 +7,12 @@ Supports:
 - Running a multi-step workflow with named steps
 - Referencing prior step outputs via `{r:step_name}`
 - Saving full response trace per run as a .dict file
+- Running combinations concurrently (bounded by --concurrency)
+- Warning when a step's substitutions defeat OpenAI prompt caching
+- Caching parsed YAML inputs in `<file>.json` sidecars for faster reruns
+- Running steps that only read {profession}/{activity} once per pair, not per feeling
+- FUSE_WORKFLOW=1: running all steps in one request per combination, with the
+  model emitting each step's output as a marked section
 
 Usage:
     python generate_combinations.py \
@@ -19,59 +25,264 @@ import os
 import re
 import json
 import yaml
+import asyncio
 import argparse
-from submit_prompt import run_chat_prompt
+import functools
+import unicodedata
+from submit_prompt import estimate_tokens, run_chat_prompt_async
+
+DEFAULT_CONCURRENCY = 32
+
+# OpenAI caches the longest shared prefix of prompts at least this long
+CACHEABLE_PREFIX_TOKENS = 1024
+
+# LibYAML's C loader when PyYAML was built with it, else the pure-Python one
+SafeLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+# Matches {profession}, {r:step_name}, etc. in prompt templates
+_TOKEN_RE = re.compile(r"\{([^\}]+)\}")
+
+_SLUG_TABLE = str.maketrans({" ": "_", "-": "_", ",": None, ":": None})
+
+# Context keys shared by every feeling for a given profession/activity pair
+OUTER_KEYS = {"profession", "activity"}
+
+FUSE_WORKFLOW = os.getenv("FUSE_WORKFLOW") == "1"
+SECTION_MARKER = "===SECTION:{}==="
+# Markers start a line, but models sometimes begin the section's text on the same line.
+# Mid-line mentions (e.g. an echoed "(your ===SECTION:x=== section above)") don't split.
+_SECTION_RE = re.compile(r"^[ \t]*===SECTION:([^\n]+?)===", re.MULTILINE)
 
 
 def load_data(filepath):
-    with open(filepath, 'r', encoding='utf-8') as f:
-        if filepath.endswith(".json"):
+    if not filepath.endswith((".json", ".yaml", ".yml")):
+        raise ValueError(f"Unsupported file type: {filepath}")
+    return load_data_cached(filepath)
+
+
+def load_data_cached(filepath):
+    """Load YAML/JSON once per process and file version."""
+    return _load_file(filepath, os.path.getmtime(filepath))
+
+
+@functools.lru_cache(maxsize=None)
+def _load_file(filepath, mtime):
+    if filepath.endswith(".json"):
+        with open(filepath, 'r', encoding='utf-8') as f:
             return json.load(f)
-        elif filepath.endswith((".yaml", ".yml")):
-            return yaml.safe_load(f)
-        else:
-            raise ValueError(f"Unsupported file type: {filepath}")
 
+    # A JSON sidecar at least as new as the YAML skips the YAML parse entirely
+    sidecar = f"{filepath}.json"
+    try:
+        if os.path.getmtime(sidecar) >= mtime:
+            with open(sidecar, 'r', encoding='utf-8') as f:
+                return json.load(f)
+    except (OSError, ValueError):
+        pass
 
-def load_workflow(filepath):
     with open(filepath, 'r', encoding='utf-8') as f:
-        return yaml.safe_load(f)
+        data = yaml.load(f, Loader=SafeLoader)
+
+    # Only write a sidecar when JSON round-trips the data exactly (no dates, non-string keys, ...)
+    try:
+        if json.loads(json.dumps(data)) == data:
+            with open(sidecar, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False)
+    except (TypeError, ValueError, OSError):
+        pass
+    return data
+
+
+def load_workflow(filepath):
+    """Load a workflow, pre-split each step's templates and record the tokens each step reads."""
+    workflow = load_data_cached(filepath)
+    check_cache_prefix(workflow)
+    compiled = []
+    for step in workflow:
+        prompt = compile_template(step["prompt"])
+        system = compile_template(step.get("system", ""))
+        compiled.append({**step, "prompt": prompt, "system": system, "inputs": set(prompt[1::2]) | set(system[1::2])})
+    return compiled
+
+
+def compile_template(template):
+    """Split a template into alternating segments: [literal, token, literal, ..., literal]."""
+    return _TOKEN_RE.split(template)
+
+
+def concat_templates(*parts):
+    """Concatenate compiled templates and plain strings into one compiled template."""
+    segments = [""]
+    for part in parts:
+        if isinstance(part, str):
+            part = [part]
+        segments[-1] += part[0]
+        segments.extend(part[1:])
+    return segments
+
+
+def fuse_workflow(workflow):
+    """Combine all steps into one step whose reply holds every step's output as a marked section."""
+    system_parts = []
+    for step in workflow:
+        if "".join(step["system"]):
+            system_parts += ["\n\n", step["system"]] if system_parts else [step["system"]]
+
+    prompt_parts = [f"Produce the following sections in order, each prefixed by {SECTION_MARKER.format('<name>')}"]
+    for step in workflow:
+        prompt_parts += [f"\n\n{SECTION_MARKER.format(step['name'])}\n", step["prompt"]]
+
+    return {"name": "fused", "system": concat_templates(*system_parts), "prompt": concat_templates(*prompt_parts)}
+
+
+def split_sections(text, workflow):
+    """Split a fused reply back into {step_name: section text}."""
+    parts = _SECTION_RE.split(text)
+    sections = {name.strip(): body.strip() for name, body in zip(parts[1::2], parts[2::2])}
+    return {step["name"]: sections.get(step["name"], f"[MISSING:{step['name']}]") for step in workflow}
+
+
+def partition_workflow(workflow):
+    """Split steps into (outer, inner): outer steps read only profession/activity and other outer steps.
+
+    A step referenced before it runs stays inner so it still renders as [MISSING:...]
+    for that earlier step, as it would when running in order.
+    """
+    outer_names, referenced = set(), set()
+    for step in workflow:
+        if step["name"] not in referenced and all(
+            token in OUTER_KEYS or (token.startswith("r:") and token[2:] in outer_names)
+            for token in step["inputs"]
+        ):
+            outer_names.add(step["name"])
+        referenced.update(token[2:] for token in step["inputs"] if token.startswith("r:"))
+
+    outer = [step for step in workflow if step["name"] in outer_names]
+    inner = [step for step in workflow if step["name"] not in outer_names]
+    return outer, inner
+
+
+def split_template(template):
+    """Split a template into its static prefix and the rest, starting at the first substitution."""
+    match = _TOKEN_RE.search(template)
+    if not match:
+        return template, ""
+    return template[:match.start()], template[match.start():]
+
+
+def check_cache_prefix(workflow):
+    """Warn about steps whose substitutions fall inside the prefix the prompt cache would reuse.
+
+    The system prompt is sent first, so a step is cache-friendly when its system
+    prompt (and the start of the user prompt) stays identical across combinations
+    and per-combination values like {feeling} or {r:step} come after it.
+    """
+    def tokens(text):
+        return estimate_tokens([{"content": text}], "gpt-4o")
+
+    for step in workflow:
+        system = step.get("system", "")
+        system_static, system_dynamic = split_template(system)
+        if system_dynamic:
+            static = system_static
+        else:
+            prompt_static, _ = split_template(step["prompt"])
+            static = system_static + prompt_static
+
+        total = tokens(system + step["prompt"])
+        if total >= CACHEABLE_PREFIX_TOKENS and tokens(static) < CACHEABLE_PREFIX_TOKENS:
+            print(
+                f"[WARN] Step '{step['name']}': first substitution is ~{tokens(static)} tokens in, "
+                f"so its ~{total}-token prompt can't be served from the prompt cache. "
+                "Move per-combination values to the end of the prompt."
+            )
 
 
 def slugify(text):
-    return text.lower().replace(" ", "_").replace(",", "").replace(":", "").replace("-", "_")
+    if not text.isascii():
+        # Drop accents (café -> cafe) but keep other scripts: 日本 and Врач stay as they are
+        decomposed = unicodedata.normalize("NFKD", text)
+        text = unicodedata.normalize("NFC", "".join(ch for ch in decomposed if not unicodedata.combining(ch)))
+    return text.lower().translate(_SLUG_TABLE)
 
 
 def substitute_prompt_template(template, context, response_dict):
     """
     Replace {input}, {profession}, etc. with context
     Replace {r:step_name} with the value of that step's response
+
+    `template` is a string or a segment list from compile_template.
     """
-    def replace_token(match):
-        token = match.group(1)
-        if token.startswith("r:"):
-            step_key = token[2:]
-            return response_dict.get(step_key, f"[MISSING:{step_key}]")
-        return context.get(token, f"[UNKNOWN:{token}]")
+    if isinstance(template, str):
+        template = compile_template(template)
+
+    parts = []
+    for i, segment in enumerate(template):
+        if i % 2 == 0:
+            parts.append(segment)
+        elif segment.startswith("r:"):
+            step_key = segment[2:]
+            parts.append(response_dict.get(step_key, f"[MISSING:{step_key}]"))
+        else:
+            parts.append(context.get(segment, f"[UNKNOWN:{segment}]"))
+    return "".join(parts)
 
-    return re.sub(r"\{([^\}]+)\}", replace_token, template)
 
+async def run_workflow(context, workflow, semaphore, outer_results=None):
+    """Run each step and capture all responses into a dictionary keyed by step name.
+
+    Steps run in order since later steps may reference earlier results; the
+    semaphore bounds how many requests are in flight across all contexts.
+    With FUSE_WORKFLOW=1 all steps go out as a single request instead.
+
+    When `outer_results` is given, steps that only depend on profession/activity
+    run once per pair and are shared through it by every feeling for that pair.
+    """
+    if FUSE_WORKFLOW:
+        return await run_fused_workflow(context, workflow, semaphore)
 
-def run_workflow(context, workflow):
-    """Run each step and capture all responses into a dictionary keyed by step name."""
-    responses = {}
     print (context)
-    for step in workflow:
+    if outer_results is None:
+        return await run_steps(workflow, context, {}, semaphore)
+
+    outer_steps, inner_steps = partition_workflow(workflow)
+    key = (context["profession"], context["activity"])
+    if key not in outer_results:
+        outer_results[key] = asyncio.ensure_future(run_steps(outer_steps, context, {}, semaphore))
+    responses = dict(await outer_results[key])
+
+    await run_steps(inner_steps, context, responses, semaphore)
+    return {step["name"]: responses[step["name"]] for step in workflow}
+
+
+async def run_steps(steps, context, responses, semaphore):
+    """Run steps in order, adding each result to `responses`."""
+    for step in steps:
         step_name = step["name"]
         prompt = substitute_prompt_template(step["prompt"], context, responses)
         system_prompt = substitute_prompt_template(step.get("system", ""), context, responses)
         print (step_name + " - " + prompt)
 
-        result = run_chat_prompt(prompt, system_prompt=system_prompt)
+        async with semaphore:
+            result = await run_chat_prompt_async(prompt, system_prompt=system_prompt)
         responses[step_name] = result
     return responses
 
 
+async def run_fused_workflow(context, workflow, semaphore):
+    """Run every step in one request and split the reply into per-step responses."""
+    fused = fuse_workflow(workflow)
+    # Earlier results don't exist yet; {r:step} points the model at its own section instead
+    placeholders = {step["name"]: f"(your {SECTION_MARKER.format(step['name'])} section above)" for step in workflow}
+    prompt = substitute_prompt_template(fused["prompt"], context, placeholders)
+    system_prompt = substitute_prompt_template(fused["system"], context, placeholders)
+    print (context)
+
+    async with semaphore:
+        result = await run_chat_prompt_async(prompt, system_prompt=system_prompt)
+    return split_sections(result, workflow)
+
+
 def write_dict(path, data):
     if path.endswith(".json"):
         with open(path, "w", encoding="utf-8") as f:
@@ -81,45 +292,74 @@ def write_dict(path, data):
             yaml.dump(data, f, sort_keys=False, allow_unicode=True)
 
 
-def main():
-    parser = argparse.ArgumentParser(description="Run AI prompt workflows on structured profession/feeling input.")
-    parser.add_argument("--professions", required=True, help="Path to professions YAML/JSON file")
-    parser.add_argument("--feelings", required=True, help="Path to feelings YAML/JSON file")
-    parser.add_argument("--workflow", required=True, help="Path to prompt workflow YAML file")
-    parser.add_argument("--output-dir", default="outputs", help="Directory to write results (default: outputs/)")
+async def run_all(contexts, workflow, output_dir, concurrency):
+    """Run the workflow for every context concurrently."""
+    semaphore = asyncio.Semaphore(concurrency)
+    outer_results = {}  # (profession, activity) -> task running the feeling-independent steps
+    tasks = [run_and_write(context, workflow, output_dir, semaphore, outer_results) for context in contexts]
+    await asyncio.gather(*tasks)
 
-    args = parser.parse_args()
-    os.makedirs(args.output_dir, exist_ok=True)
 
-    professions = load_data(args.professions)
-    feelings = load_data(args.feelings)
-    workflow = load_workflow(args.workflow)
+async def run_and_write(context, workflow, output_dir, semaphore, outer_results):
+    """Run one context and write its outputs."""
+    responses = await run_workflow(context, workflow, semaphore, outer_results)
+    write_outputs(context, workflow, responses, output_dir)
+
+
+def output_basename(context):
+    return f"{slugify(context['profession'])}_{slugify(context['activity'])}_{slugify(context['feeling'])}"
+
 
+def write_outputs(context, workflow, responses, output_dir):
+    """Write the final step's text and the full response dictionary for one context."""
+    filename_base = output_basename(context)
+    text_output = os.path.join(output_dir, f"{filename_base}.txt")
+    dict_output = os.path.join(output_dir, f"{filename_base}.dict.yaml")
+
+    # Final step output
+    last_step = workflow[-1]["name"]
+    with open(text_output, "w", encoding="utf-8") as f:
+        f.write(responses[last_step])
+
+    # Full response dictionary
+    write_dict(dict_output, responses)
+
+
+def build_contexts(professions, feelings):
+    """Expand profession/activity and feeling dictionaries into one context per combination."""
+    contexts = []
     for profession, activities in professions.items():
         for activity in activities:
             for feeling_category, feeling_list in feelings.items():
                 for feeling in feeling_list:
-                    context = {
+                    contexts.append({
                         "profession": profession,
                         "activity": activity,
                         "feeling": feeling,
                         "feeling_category": feeling_category,
                         "input": f"A {profession} who is feeling {feeling} while {activity}"
-                    }
+                    })
+    return contexts
 
-                    responses = run_workflow(context, workflow)
 
-                    filename_base = f"{slugify(profession)}_{slugify(activity)}_{slugify(feeling)}"
-                    text_output = os.path.join(args.output_dir, f"{filename_base}.txt")
-                    dict_output = os.path.join(args.output_dir, f"{filename_base}.dict.yaml")
+def main():
+    parser = argparse.ArgumentParser(description="Run AI prompt workflows on structured profession/feeling input.")
+    parser.add_argument("--professions", required=True, help="Path to professions YAML/JSON file")
+    parser.add_argument("--feelings", required=True, help="Path to feelings YAML/JSON file")
+    parser.add_argument("--workflow", required=True, help="Path to prompt workflow YAML file")
+    parser.add_argument("--output-dir", default="outputs", help="Directory to write results (default: outputs/)")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help=f"Max in-flight API requests (default: {DEFAULT_CONCURRENCY})")
+
+    args = parser.parse_args()
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    professions = load_data(args.professions)
+    feelings = load_data(args.feelings)
+    workflow = load_workflow(args.workflow)
 
-                    # Final step output
-                    last_step = workflow[-1]["name"]
-                    with open(text_output, "w", encoding="utf-8") as f:
-                        f.write(responses[last_step])
+    contexts = build_contexts(professions, feelings)
 
-                    # Full response dictionary
-                    write_dict(dict_output, responses)
+    asyncio.run(run_all(contexts, workflow, args.output_dir, args.concurrency))
 
 if __name__ == "__main__":
     main()
@@ -5,12 +5,14 @@ convert_front_matter.py
 
 Detects Hugo PaperMod vs Astro front matter in a Markdown file,
 converts PaperMod to AstroLaunch UI format, and updates/inserts
-key-value pairs via CLI.
+key-value pairs via CLI. Pass a directory to process every Markdown
+file beneath it in one run.
 
 Value Created: Simplifies Hugo→Astro migrations with repeatable structure.
 Audience: Developers migrating static sites between frameworks.
 """
 
+import os
 import sys
 import argparse
 import frontmatter
@@ -19,6 +21,15 @@ import re
 import yaml
 from datetime import datetime
 import shutil
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+# LibYAML's C loader when PyYAML was built with it, else the pure-Python one
+SafeLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+# Integers YAML reads as base 10 (a leading 0 means octal in YAML 1.1, so leave those to YAML)
+INT_RE = re.compile(r"[-+]?(0|[1-9][0-9]*)")
+
+BACKUP_PREFIX = "mfm_"
 
 def detect_format(fm: dict) -> str:
     if "type" in fm or "author" in fm or "ShowReadingTime" in fm:
@@ -39,53 +50,93 @@ def convert_to_astrolaunch(fm: dict) -> dict:
         "tags": fm.get("tags", []),
     }
 
+def parse_value(value: str):
+    """Parse a CLI value as YAML would, skipping the YAML parser for common literals."""
+    if value in ("true", "True", "TRUE"):
+        return True
+    if value in ("false", "False", "FALSE"):
+        return False
+    if INT_RE.fullmatch(value):
+        return int(value)
+    if len(value) >= 2 and value[0] == value[-1] and value[0] in "\"'":
+        inner = value[1:-1]
+        if value[0] not in inner and "\\" not in inner:
+            return inner
+    try:
+        return yaml.load(value, Loader=SafeLoader)
+    except yaml.YAMLError:
+        return value
+
 def update_or_insert(fm: dict, overrides: list[tuple[str, str]]) -> dict:
     for k, v in overrides:
-        try:
-            v_parsed = yaml.safe_load(v)
-        except yaml.YAMLError:
-            v_parsed = v
-        fm[k] = v_parsed
+        fm[k] = parse_value(v)
     return fm
 
-def main():
-    parser = argparse.ArgumentParser(description="Convert PaperMod to AstroLaunch UI front matter.")
-    parser.add_argument("filepath", type=Path, help="Markdown file to process")
-    parser.add_argument("--set", action="append", metavar="KEY=VALUE", help="Key-value pair to update/add")
-
-    args = parser.parse_args()
-
-    if not args.filepath.exists():
-        sys.exit("File not found.")
-
-    post = frontmatter.load(args.filepath)
+def process_one(filepath: Path, overrides: list[tuple[str, str]]) -> None:
+    post = frontmatter.load(filepath)
     fmt = detect_format(post.metadata)
-    print(f"Detected format: {fmt}")
+    # Directory mode runs files concurrently, so every line names its file
+    print(f"{filepath}: detected format: {fmt}")
 
     if fmt == "papermod":
         post.metadata = convert_to_astrolaunch(post.metadata)
-        print("Converted to AstroLaunch UI front matter.")
-
-    if args.set:
-        overrides = []
-        for item in args.set:
-            if "=" not in item:
-                sys.exit(f"Invalid format for --set: {item}")
-            key, value = item.split("=", 1)
-            overrides.append((key, value))
+        print(f"{filepath}: converted to AstroLaunch UI front matter.")
+
+    if overrides:
         post.metadata = update_or_insert(post.metadata, overrides)
-        print("Applied overrides.")
+        print(f"{filepath}: applied overrides.")
 
     # Create backup
     timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
-    backup_path = args.filepath.parent / f"mfm_{timestamp}_{args.filepath.name}"
-    shutil.copy2(args.filepath, backup_path)
+    backup_path = filepath.parent / f"{BACKUP_PREFIX}{timestamp}_{filepath.name}"
+    shutil.copy2(filepath, backup_path)
     print(f"Backup created: {backup_path}")
 
     # Rewrite file
-    with open(args.filepath, "w", encoding="utf-8") as f:
+    with open(filepath, "w", encoding="utf-8") as f:
         f.write(frontmatter.dumps(post))
-        print(f"Updated: {args.filepath}")
+        print(f"Updated: {filepath}")
+
+def find_markdown_files(directory: Path) -> list[Path]:
+    """Return Markdown files under directory, skipping backups from earlier runs."""
+    return sorted(p for p in directory.rglob("*.md") if not p.name.startswith(BACKUP_PREFIX))
+
+def process_many(paths: list[Path], overrides: list[tuple[str, str]]) -> list[tuple[Path, Exception]]:
+    """Process every file, carrying on past failures. Returns (path, error) for each file that failed."""
+    # Worker processes only pay for their startup once there are several files per core
+    workers = os.cpu_count() or 1
+    executor = ProcessPoolExecutor if len(paths) >= workers * 4 else ThreadPoolExecutor
+    with executor() as ex:
+        futures = {path: ex.submit(process_one, path, overrides) for path in paths}
+
+    failures = [(path, future.exception()) for path, future in futures.items() if future.exception()]
+    print(f"Updated {len(paths) - len(failures)} of {len(paths)} files.")
+    for path, error in failures:
+        print(f"Failed: {path}: {error}", file=sys.stderr)
+    return failures
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert PaperMod to AstroLaunch UI front matter.")
+    parser.add_argument("filepath", type=Path, help="Markdown file, or directory of Markdown files, to process")
+    parser.add_argument("--set", action="append", metavar="KEY=VALUE", help="Key-value pair to update/add")
+
+    args = parser.parse_args()
+
+    if not args.filepath.exists():
+        sys.exit("File not found.")
+
+    overrides = []
+    for item in args.set or []:
+        if "=" not in item:
+            sys.exit(f"Invalid format for --set: {item}")
+        key, value = item.split("=", 1)
+        overrides.append((key, value))
+
+    if args.filepath.is_dir():
+        if process_many(find_markdown_files(args.filepath), overrides):
+            sys.exit(1)
+    else:
+        process_one(args.filepath, overrides)
 
 if __name__ == "__main__":
     main()
@@ -29,10 +29,13 @@ import os
 import re
 import logging
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 
 import oracledb
-import sqlglot
 from sqlglot.expressions import Table, Func
+from sqlglot.dialects.dialect import Dialect
+from sqlglot.dialects.oracle import Oracle
+from sqlglot.tokens import TokenType
 
 # Configure Logging
 logging.basicConfig(
@@ -42,6 +45,34 @@ logging.basicConfig(
 
 OUTPUT_BASE_DIR = "output"
 
+# Oracle caps IN lists at 1000 expressions; each (owner, name) pair uses two binds
+IN_LIST_CHUNK = 500
+# Below this many views per level, process startup costs more than it saves
+PARALLEL_PARSE_MIN = 4
+# Output is many small files; threads overlap the file-creation syscalls
+WRITE_WORKERS = 16
+
+BLOCK_COMMENT_RE = re.compile(r"/\*.*?\*/", re.DOTALL)
+LINE_COMMENT_RE = re.compile(r"--.*?$", re.MULTILINE)
+
+NAME_TOKENS = {TokenType.VAR, TokenType.IDENTIFIER}
+# Token types that never parse into a sqlglot Func node (AND/OR and parentheses do).
+# A statement made only of these has no functions, so its tables can be read from tokens.
+PLAIN_TOKENS = NAME_TOKENS | {
+    TokenType.SELECT, TokenType.DISTINCT, TokenType.FROM, TokenType.JOIN,
+    TokenType.INNER, TokenType.LEFT, TokenType.RIGHT, TokenType.OUTER, TokenType.FULL,
+    TokenType.CROSS, TokenType.ON, TokenType.WHERE, TokenType.GROUP_BY, TokenType.ORDER_BY,
+    TokenType.ASC, TokenType.DESC, TokenType.ALIAS, TokenType.DOT, TokenType.COMMA,
+    TokenType.STAR, TokenType.NUMBER, TokenType.STRING, TokenType.NULL, TokenType.IS,
+    TokenType.NOT, TokenType.EQ, TokenType.NEQ, TokenType.LT, TokenType.LTE, TokenType.GT,
+    TokenType.GTE, TokenType.PLUS, TokenType.DASH, TokenType.SLASH, TokenType.DPIPE,
+    TokenType.LIKE,
+}
+# Bare names the Oracle parser turns into functions, e.g. SYSDATE
+NO_PAREN_FUNCTION_NAMES = set(Oracle.Parser.NO_PAREN_FUNCTION_PARSERS)
+ORACLE = Dialect.get_or_raise("oracle")
+FROM_CLAUSE_END = {TokenType.WHERE, TokenType.GROUP_BY, TokenType.ORDER_BY}
+
 ORACLE_BUILTINS = {...}  # Unchanged (truncated for brevity)
 SQL_KEYWORDS = {...}  # Unchanged (truncated for brevity)
 
@@ -50,14 +81,13 @@ found_views = set()
 found_tables = set()
 found_functions = {}
 view_ddl_map = {}
-dependency_graph = defaultdict(list)
+parsed_ddls = {}  # DDL -> (tables, functions); kept in the parent, workers can't share it
+dependency_graph = defaultdict(set)
 
 
 def clean_sql(sql):
     """Remove comments and normalize whitespace."""
-    sql = re.sub(r"/\*.*?\*/", "", sql, flags=re.DOTALL)
-    sql = re.sub(r"--.*?$", "", sql, flags=re.MULTILINE)
-    return sql.strip()
+    return LINE_COMMENT_RE.sub("", BLOCK_COMMENT_RE.sub("", sql)).strip()
 
 
 def classify_function(name):
@@ -78,16 +108,38 @@ def strip_alias(name):
 
 
 def extract_objects_from_sql(sql):
-    """Extract tables and UDFs from SQL using sqlglot parser."""
+    """Extract tables and UDFs from SQL, scanning tokens when possible, else with sqlglot's parser."""
     sql = clean_sql(sql)
     try:
-        parsed = sqlglot.parse_one(sql, dialect="oracle")
+        tokens = ORACLE.tokenize(sql)
+    except Exception:
+        return (), {}
+
+    fast = _extract_from_tokens(tokens)
+    if fast is not None:
+        return fast
+    # Hand the parser the same tokens so the fallback doesn't tokenize twice
+    return _extract_with_parser(sql, tokens)
+
+
+def _extract_with_parser(sql, tokens=None):
+    """Extract tables and UDFs by walking sqlglot's parse tree.
+
+    Same as walking sqlglot.parse_one(sql, dialect="oracle"); pass `tokens` from
+    ORACLE.tokenize(sql) to skip tokenizing again.
+    """
+    try:
+        if tokens is None:
+            tokens = ORACLE.tokenize(sql)
+        statements = ORACLE.parser().parse(tokens, sql)
     except Exception:
-        return [], {}
+        return (), {}
+    if not statements or statements[0] is None:
+        return (), {}
 
     tables, functions = set(), {}
 
-    for node in parsed.walk():
+    for node in (n for statement in statements if statement for n in statement.walk()):
         if isinstance(node, Table):
             tables.add(strip_alias(node.sql(dialect="oracle")))
         elif isinstance(node, Func):
@@ -95,38 +147,126 @@ def extract_objects_from_sql(sql):
             if classify_function(fname) == "UDF":
                 functions[fname] = "UDF"
 
-    return sorted(tables), functions
+    return tuple(sorted(tables)), functions
 
 
-def get_object_type_and_text(conn, owner, object_name):
-    """Fetch object type and DDL if applicable."""
+def _read_table_name(tokens, i):
+    """Read a dotted object name starting at tokens[i]. Returns (name or None, next index)."""
+    parts = []
+    while i < len(tokens) and tokens[i].token_type in NAME_TOKENS:
+        tok = tokens[i]
+        parts.append(f'"{tok.text}"' if tok.token_type == TokenType.IDENTIFIER else tok.text)
+        i += 1
+        if i < len(tokens) and tokens[i].token_type == TokenType.DOT:
+            i += 1
+        else:
+            break
+    return (".".join(parts) or None), i
+
+
+def _extract_from_tokens(tokens):
+    """Fast path for flat, function-free SELECTs: read tables after FROM/JOIN.
+
+    Returns None for anything the parser could turn into a function (calls,
+    parentheses, CASE, AND/OR, SYSDATE, ...) and for CTEs and subqueries, so
+    those go through _extract_with_parser and report functions exactly as before.
+    """
+    # Stops at the first call or parenthesis, so the parser fallback pays almost nothing for it
+    if not all(tok.token_type in PLAIN_TOKENS for tok in tokens):
+        return None
+    token_types = [tok.token_type for tok in tokens]
+    if token_types.count(TokenType.SELECT) != 1:
+        return None
+    if any(tok.text.upper() in NO_PAREN_FUNCTION_NAMES for tok in tokens if tok.token_type == TokenType.VAR):
+        return None
+
+    tables = set()
+    in_from = False
+    i = 0
+    while i < len(tokens):
+        token_type = token_types[i]
+
+        # FROM/JOIN start table references; commas separate tables until the FROM clause ends
+        if token_type in (TokenType.FROM, TokenType.JOIN) or (token_type == TokenType.COMMA and in_from):
+            in_from = True
+            name, i = _read_table_name(tokens, i + 1)
+            if name is None:
+                return None
+            tables.add(name)
+            if i < len(tokens) and token_types[i] == TokenType.ALIAS:
+                i += 1
+            if i < len(tokens) and token_types[i] in NAME_TOKENS:
+                i += 1
+            continue
+
+        if token_type in FROM_CLAUSE_END:
+            in_from = False
+        i += 1
+
+    return tuple(sorted(tables)), {}
+
+
+def get_objects_type_and_text(conn, fq_names):
+    """Fetch object type and DDL for many objects, one query per IN-list chunk.
+
+    Returns {fq_name: (object_type, ddl)}; objects that don't exist are omitted.
+    ALL_VIEWS.TEXT is a LONG, which python-oracledb returns as a plain str, so
+    each view's DDL arrives whole with no LOB reads or reassembly.
+    """
+    results = {}
+    names = sorted(fq_names)
     with conn.cursor() as cur:
-        cur.execute(
-            """
-            SELECT object_type
-            FROM all_objects
-            WHERE object_name = :obj AND owner = :owner
-        """,
-            {"obj": object_name.upper(), "owner": owner.upper()},
-        )
-        row = cur.fetchone()
-        if not row:
-            return None, None
-        obj_type = row[0]
-        if obj_type == "VIEW":
+        # Ask for a chunk's rows per fetch call. No prefetchrows: OCI turns off
+        # prefetching for queries with LONG columns such as ALL_VIEWS.TEXT.
+        cur.arraysize = IN_LIST_CHUNK
+        for start in range(0, len(names), IN_LIST_CHUNK):
+            binds, pairs = {}, []
+            for i, fq_name in enumerate(names[start : start + IN_LIST_CHUNK]):
+                owner, object_name = fq_name.split(".")
+                binds[f"owner{i}"] = owner
+                binds[f"obj{i}"] = object_name
+                pairs.append(f"(:owner{i}, :obj{i})")
+
+            # all_objects can list several rows per name (e.g. TABLE and TABLE PARTITION);
+            # prefer the VIEW row, then TABLE, so the result does not depend on row order.
             cur.execute(
-                """
-                SELECT text
-                FROM all_views
-                WHERE view_name = :obj AND owner = :owner
+                f"""
+                SELECT o.owner, o.object_name, o.object_type, v.text
+                FROM all_objects o
+                LEFT JOIN all_views v
+                  ON v.owner = o.owner AND v.view_name = o.object_name
+                WHERE (o.owner, o.object_name) IN ({", ".join(pairs)})
+                ORDER BY o.owner, o.object_name,
+                         CASE o.object_type WHEN 'VIEW' THEN 0 WHEN 'TABLE' THEN 1 ELSE 2 END
             """,
-                {"obj": object_name.upper(), "owner": owner.upper()},
+                binds,
             )
-            rows = cur.fetchall()
-            ddl = clean_sql("\n".join(r[0] for r in rows))
-            view_ddl_map[f"{owner}.{object_name}"] = ddl
-            return "VIEW", ddl
-        return "TABLE", None
+            for owner, object_name, obj_type, text in cur:
+                fq_name = f"{owner}.{object_name}"
+                if fq_name in results:
+                    continue
+                if obj_type == "VIEW":
+                    ddl = clean_sql(text or "")
+                    view_ddl_map[fq_name] = ddl
+                    results[fq_name] = ("VIEW", ddl)
+                else:
+                    results[fq_name] = ("TABLE", None)
+    return results
+
+
+def parse_view_ddls(ddls, pool):
+    """Extract (tables, functions) from each DDL, across processes for larger batches.
+
+    Each distinct DDL is parsed once per crawl: duplicates and DDLs parsed at an
+    earlier level are answered from parsed_ddls before anything goes to the pool.
+    """
+    pending = sorted(set(ddls) - parsed_ddls.keys())
+    if len(pending) < PARALLEL_PARSE_MIN:
+        results = map(extract_objects_from_sql, pending)
+    else:
+        results = pool.map(extract_objects_from_sql, pending)
+    parsed_ddls.update(zip(pending, results))
+    return [parsed_ddls[ddl] for ddl in ddls]
 
 
 def fully_qualify(name, default_schema):
@@ -135,37 +275,36 @@ def fully_qualify(name, default_schema):
 
 
 def crawl_object(conn, fq_object):
-    """Begin recursive crawl."""
-    owner, object_name = fq_object.split(".")
-    _crawl(conn, owner.upper(), object_name.upper(), owner.upper())
-
-
-def _crawl(conn, owner, object_name, default_schema):
-    fq_name = f"{owner}.{object_name}"
-    if fq_name in SEEN_OBJECTS:
-        return
-    SEEN_OBJECTS.add(fq_name)
-
-    obj_type, ddl = get_object_type_and_text(conn, owner, object_name)
-
-    if not obj_type:
-        logging.error(f"Object not found: {fq_name}")
-        sys.exit(3)
-
-    if obj_type == "TABLE":
-        found_tables.add(fq_name)
-        return
-
-    found_views.add(fq_name)
-    tables, functions = extract_objects_from_sql(ddl)
-
-    for t in tables:
-        fq = fully_qualify(t, default_schema)
-        dependency_graph[fq_name].append(fq)
-        if fq.upper() != fq_name.upper():
-            _crawl(conn, *fq.split("."), default_schema)
-
-    found_functions.update(functions)
+    """Crawl dependencies breadth-first: one bulk query and one parse batch per level."""
+    default_schema = fq_object.split(".")[0].upper()
+    frontier = {fq_object.upper()}
+
+    with ProcessPoolExecutor() as pool:
+        while frontier:
+            SEEN_OBJECTS.update(frontier)
+            objects = get_objects_type_and_text(conn, frontier)
+
+            missing = frontier - objects.keys()
+            if missing:
+                for fq_name in sorted(missing):
+                    logging.error(f"Object not found: {fq_name}")
+                sys.exit(3)
+
+            views = sorted(fq for fq, (obj_type, _) in objects.items() if obj_type == "VIEW")
+            found_tables.update(fq for fq, (obj_type, _) in objects.items() if obj_type == "TABLE")
+            found_views.update(views)
+
+            next_level = set()
+            parsed = parse_view_ddls([objects[fq_name][1] for fq_name in views], pool)
+            for fq_name, (tables, functions) in zip(views, parsed):
+                for t in tables:
+                    fq = fully_qualify(t, default_schema).upper()
+                    dependency_graph[fq_name].add(fq)
+                    if fq != fq_name:
+                        next_level.add(fq)
+                found_functions.update(functions)
+
+            frontier = next_level - SEEN_OBJECTS
 
 
 def connect_thin(host, port, service, user, password):
@@ -192,15 +331,14 @@ def write_summary(output_dir):
             f.write(f" - {t}\n")
 
 
-def write_view_ddls(output_dir):
-    """Save each view's DDL."""
-    for fq_name, ddl in view_ddl_map.items():
-        with open(
-            os.path.join(output_dir, f"{sanitize_filename(fq_name)}.sql"),
-            "w",
-            encoding="utf-8",
-        ) as f:
-            f.write(ddl)
+def write_view_ddl(output_dir, fq_name, ddl):
+    """Save one view's DDL."""
+    with open(
+        os.path.join(output_dir, f"{sanitize_filename(fq_name)}.sql"),
+        "w",
+        encoding="utf-8",
+    ) as f:
+        f.write(ddl)
 
 
 def render_tree(fq_view):
@@ -209,7 +347,7 @@ def render_tree(fq_view):
 
     def _walk(node, prefix="", is_last=True):
         lines.append(f"{prefix}{'└── ' if is_last else '├── '}{node}")
-        children = dependency_graph.get(node, [])
+        children = sorted(dependency_graph.get(node, ()))
         for i, child in enumerate(children):
             is_last_child = i == len(children) - 1
             new_prefix = prefix + ("    " if is_last else "│   ")
@@ -225,11 +363,18 @@ def write_tree(output_dir, fq_view):
         f.write(render_tree(fq_view))
 
 
-try:
-    oracledb.init_oracle_client(lib_dir=r"C:\Oracle\instantclient_23_7")
-    logging.info("Oracle Instant Client loaded — using thick mode")
-except Exception as e:
-    logging.warning(f"Could not load Oracle Client — using thin mode instead: {e}")
+def write_outputs(output_dir, fq_view):
+    """Save view DDLs, summary.txt and tree.txt using a thread pool."""
+    with ThreadPoolExecutor(max_workers=WRITE_WORKERS) as pool:
+        futures = [
+            pool.submit(write_view_ddl, output_dir, fq_name, ddl)
+            for fq_name, ddl in view_ddl_map.items()
+        ]
+        futures.append(pool.submit(write_summary, output_dir))
+        futures.append(pool.submit(write_tree, output_dir, fq_view))
+        for future in futures:
+            future.result()
+
 
 if __name__ == "__main__":
     if len(sys.argv) != 7:
@@ -241,6 +386,13 @@ if __name__ == "__main__":
 
     host, port, service, user, password, fq_object = sys.argv[1:]
 
+    # Only in the main process: parse workers re-import this module under spawn
+    try:
+        oracledb.init_oracle_client(lib_dir=r"C:\Oracle\instantclient_23_7")
+        logging.info("Oracle Instant Client loaded — using thick mode")
+    except Exception as e:
+        logging.warning(f"Could not load Oracle Client — using thin mode instead: {e}")
+
     try:
         conn = connect_thin(host, port, service, user, password)
     except oracledb.Error as e:
@@ -257,9 +409,7 @@ if __name__ == "__main__":
     output_dir = os.path.join(OUTPUT_BASE_DIR, fq_object)
     os.makedirs(output_dir, exist_ok=True)
 
-    write_view_ddls(output_dir)
-    write_summary(output_dir)
-    write_tree(output_dir, fq_object)
+    write_outputs(output_dir, fq_object)
 
     logging.info("Dependency crawl complete. Output in: %s", output_dir)
     sys.exit(0)
@@ -0,0 +1,183 @@
+"""
+semantic_cache.py
+
+Purpose:
+    Reuse chat completions for prompts that are near-duplicates of ones already
+    answered (e.g. "anxious" vs "nervous" in the same workflow step). Prompts are
+    compared by cosine similarity of their embeddings; a match at or above the
+    threshold returns the stored completion instead of calling the model again.
+
+Audience:
+    Developers running large prompt sweeps where many inputs differ only by synonym.
+
+Storage:
+    One JSON line per entry in <path>/entries.jsonl, with the embedding packed as
+    base64 float32 (~8 KB for a 1536-dim vector). Only entries for the same model
+    are considered a match.
+
+Limits:
+    The cache keeps the newest `max_entries` entries and evicts the oldest. With
+    numpy installed, vectors live in one float32 matrix and a lookup is a single
+    matrix-vector product (a few ms at the default 10,000 entries). Without numpy
+    the lookup is a Python scan, so the default cap drops to 2,000 (~0.1 s).
+    On start only the newest `max_entries` lines are loaded, and the file is
+    compacted once it holds more than twice that. lookup() and add() block, so
+    async callers should run them in a thread (asyncio.to_thread).
+
+Usage (imported):
+    from semantic_cache import SemanticCache
+    cache = SemanticCache(path=".semcache")
+    hit = cache.lookup(embedding, model="gpt-4o")
+    if hit is None:
+        cache.add(embedding, model="gpt-4o", response=response_dict)
+"""
+
+import os
+import json
+import math
+import base64
+import operator
+import threading
+from array import array
+from collections import deque
+from typing import List, Optional
+
+try:
+    import numpy as np
+except ImportError:  # optional; lookups fall back to a Python scan over fewer entries
+    np = None
+
+DEFAULT_MAX_ENTRIES = 10000 if np is not None else 2000
+
+# math.sumprod (Python 3.12+) runs the dot product in C
+_dot = getattr(math, "sumprod", None) or (lambda a, b: sum(map(operator.mul, a, b)))
+
+
+def normalize(vector: List[float]) -> array:
+    norm = math.sqrt(_dot(vector, vector)) or 1.0
+    return array("f", (x / norm for x in vector))
+
+
+class SemanticCache:
+    """Embedding-similarity cache for chat completion responses, bounded to `max_entries`."""
+
+    def __init__(self, path: str = ".semcache", threshold: float = 0.92, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self._entries_path = os.path.join(path, "entries.jsonl")
+        self._lock = threading.Lock()
+
+        # Ring buffer: slot `_next` is overwritten next, evicting the oldest entry
+        self._models = [None] * max_entries
+        self._responses = [None] * max_entries
+        self._vectors = [None] * max_entries  # array("f") per slot, without numpy
+        self._matrix = None  # (max_entries, dim) float32, with numpy
+        self._model_ids = None
+        self._model_index = {}
+        self._dim = None  # set by the first entry; other sizes are rejected
+        self._next = 0
+        self._count = 0
+
+        self._load()
+
+    def _load(self) -> None:
+        if not os.path.exists(self._entries_path):
+            return
+        lines = 0
+        newest = deque(maxlen=self.max_entries)
+        with open(self._entries_path, "r", encoding="utf-8") as f:
+            for line in f:
+                lines += 1
+                newest.append(line)
+        for line in newest:
+            try:
+                entry = json.loads(line)
+                vector = array("f")
+                vector.frombytes(base64.b64decode(entry["embedding"]))
+            except (ValueError, KeyError):
+                continue  # skip a partially written trailing line
+            self._store(entry["model"], vector, entry["response"])
+        if lines > 2 * self.max_entries:
+            self._rewrite()
+
+    def _rewrite(self) -> None:
+        """Compact the file down to the entries kept in memory."""
+        tmp_path = f"{self._entries_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for slot in self._slots():
+                f.write(self._serialize(slot))
+        os.replace(tmp_path, self._entries_path)
+
+    def _slots(self):
+        """Occupied slots, oldest first."""
+        if self._count < self.max_entries:
+            return range(self._count)
+        return [(self._next + i) % self.max_entries for i in range(self.max_entries)]
+
+    def _serialize(self, slot: int) -> str:
+        vector = self._matrix[slot] if self._matrix is not None else self._vectors[slot]
+        entry = {
+            "model": self._models[slot],
+            "embedding": base64.b64encode(vector.tobytes()).decode("ascii"),
+            "response": self._responses[slot],
+        }
+        return json.dumps(entry, ensure_ascii=False) + "\n"
+
+    def _store(self, model: str, vector: array, response: dict) -> Optional[int]:
+        """Place an entry in the next slot. Returns the slot, or None for a vector of the wrong size."""
+        if self._dim is None:
+            self._dim = len(vector)
+        elif len(vector) != self._dim:
+            return None
+
+        slot = self._next
+        if np is not None:
+            if self._matrix is None:
+                self._matrix = np.zeros((self.max_entries, self._dim), dtype=np.float32)
+                self._model_ids = np.full(self.max_entries, -1, dtype=np.int32)
+            self._matrix[slot] = np.frombuffer(vector, dtype=np.float32)
+            self._model_ids[slot] = self._model_index.setdefault(model, len(self._model_index))
+        else:
+            self._vectors[slot] = vector
+        self._models[slot] = model
+        self._responses[slot] = response
+        self._next = (slot + 1) % self.max_entries
+        self._count = min(self._count + 1, self.max_entries)
+        return slot
+
+    def lookup(self, embedding: List[float], model: str) -> Optional[dict]:
+        """Return the stored response most similar to `embedding`, if above the threshold."""
+        query = normalize(embedding)
+        if np is not None:
+            with self._lock:
+                model_id = self._model_index.get(model)
+                if model_id is None or len(query) != self._dim:
+                    return None
+                scores = self._matrix @ np.frombuffer(query, dtype=np.float32)
+                scores[self._model_ids != model_id] = -1.0
+                best = int(scores.argmax())
+                return self._responses[best] if scores[best] >= self.threshold else None
+
+        if len(query) != self._dim:
+            return None
+        best_score, best_response = self.threshold, None
+        with self._lock:
+            entries = list(zip(self._models, self._vectors, self._responses))
+        for entry_model, entry_vector, response in entries:
+            if entry_model != model:
+                continue
+            score = _dot(query, entry_vector)
+            if score >= best_score:
+                best_score, best_response = score, response
+        return best_response
+
+    def add(self, embedding: List[float], model: str, response: dict) -> None:
+        vector = normalize(embedding)
+        with self._lock:
+            slot = self._store(model, vector, response)
+            if slot is None:
+                return
+            os.makedirs(self.path, exist_ok=True)
+            with open(self._entries_path, "a", encoding="utf-8") as f:
+                f.write(self._serialize(slot))
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+submit_batch.py – Run a compose.py workflow through the OpenAI Batch API
+
+Purpose:
+    Same inputs and outputs as compose.py, but every profession/activity/feeling
+    combination is submitted in one Batch API job per workflow step instead of one
+    request at a time. Batch jobs cost half as much and use a separate rate-limit
+    pool; the trade-off is latency (results arrive within the 24h completion window).
+
+    Step N's batch is built from step N-1's results, so `{r:step_name}` references
+    work exactly as they do in compose.py.
+
+Usage:
+    python submit_batch.py \
+        --professions data/professions.yaml \
+        --feelings data/feelings.yaml \
+        --workflow test-compose.yaml
+"""
+
+import os
+import json
+import time
+import argparse
+
+from compose import (
+    load_data,
+    load_workflow,
+    build_contexts,
+    output_basename,
+    substitute_prompt_template,
+    write_outputs,
+)
+from submit_prompt import client
+
+ENDPOINT = "/v1/chat/completions"
+MAX_REQUESTS_PER_BATCH = 50000
+POLL_SECONDS = 30
+TERMINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+
+def build_requests(contexts, step, responses, model):
+    """Render one step for every context as Batch API request lines."""
+    lines = []
+    for context_id, context in contexts.items():
+        prompt = substitute_prompt_template(step["prompt"], context, responses[context_id])
+        system_prompt = substitute_prompt_template(step.get("system", ""), context, responses[context_id])
+
+        messages = []
+        if system_prompt:
+            messages.append({"role": "system", "content": system_prompt})
+        messages.append({"role": "user", "content": prompt})
+
+        lines.append({
+            "custom_id": f"{context_id}:{step['name']}",
+            "method": "POST",
+            "url": ENDPOINT,
+            "body": {"model": model, "messages": messages},
+        })
+    return lines
+
+
+def submit_batch(lines, input_path):
+    """Upload request lines as JSONL and start a batch job. Returns the batch object."""
+    with open(input_path, "w", encoding="utf-8") as f:
+        for line in lines:
+            f.write(json.dumps(line, ensure_ascii=False) + "\n")
+
+    with open(input_path, "rb") as f:
+        batch_file = client.files.create(file=f, purpose="batch")
+
+    batch = client.batches.create(
+        input_file_id=batch_file.id,
+        endpoint=ENDPOINT,
+        completion_window="24h",
+    )
+    print(f"Submitted batch {batch.id} ({len(lines)} requests)")
+    return batch
+
+
+def wait_for_batch(batch):
+    """Poll until the batch reaches a terminal status."""
+    while batch.status not in TERMINAL_STATUSES:
+        time.sleep(POLL_SECONDS)
+        batch = client.batches.retrieve(batch.id)
+        counts = batch.request_counts
+        print(f"Batch {batch.id}: {batch.status} ({counts.completed}/{counts.total} done, {counts.failed} failed)")
+
+    if batch.status != "completed":
+        raise RuntimeError(f"Batch {batch.id} ended with status '{batch.status}'")
+    return batch
+
+
+def read_results(batch):
+    """Return {custom_id: content} for every successful request in a completed batch."""
+    results = {}
+    if not batch.output_file_id:
+        return results
+
+    for line in client.files.content(batch.output_file_id).text.splitlines():
+        record = json.loads(line)
+        response = record.get("response") or {}
+        if response.get("status_code") != 200:
+            continue
+        content = response["body"]["choices"][0]["message"]["content"]
+        results[record["custom_id"]] = content.strip()
+    return results
+
+
+def run_step(contexts, step, responses, model, work_dir):
+    """Run one workflow step for all contexts and record each result in `responses`."""
+    lines = build_requests(contexts, step, responses, model)
+
+    batches = []
+    for i in range(0, len(lines), MAX_REQUESTS_PER_BATCH):
+        input_path = os.path.join(work_dir, f"batch_{step['name']}_{i // MAX_REQUESTS_PER_BATCH}.jsonl")
+        batches.append(submit_batch(lines[i:i + MAX_REQUESTS_PER_BATCH], input_path))
+
+    results = {}
+    for batch in batches:
+        results.update(read_results(wait_for_batch(batch)))
+
+    for context_id in contexts:
+        custom_id = f"{context_id}:{step['name']}"
+        responses[context_id][step["name"]] = results.get(custom_id, f"[FAILED:{custom_id}]")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run AI prompt workflows through the OpenAI Batch API.")
+    parser.add_argument("--professions", required=True, help="Path to professions YAML/JSON file")
+    parser.add_argument("--feelings", required=True, help="Path to feelings YAML/JSON file")
+    parser.add_argument("--workflow", required=True, help="Path to prompt workflow YAML file")
+    parser.add_argument("--output-dir", default="outputs", help="Directory to write results (default: outputs/)")
+    parser.add_argument("--model", default="gpt-4o", help="Chat model to use (default: gpt-4o)")
+
+    args = parser.parse_args()
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    professions = load_data(args.professions)
+    feelings = load_data(args.feelings)
+    workflow = load_workflow(args.workflow)
+
+    # Keyed by output basename, which is unique per combination and safe as a custom_id
+    contexts = {output_basename(c): c for c in build_contexts(professions, feelings)}
+    responses = {context_id: {} for context_id in contexts}
+
+    for step in workflow:
+        print(f"Running step '{step['name']}' for {len(contexts)} combinations")
+        run_step(contexts, step, responses, args.model, args.output_dir)
+
+    for context_id, context in contexts.items():
+        write_outputs(context, workflow, responses[context_id], args.output_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -8,10 +8,17 @@ Purpose:
 
 Audience:
     Developers using openai>=1.0.0 for automated workflows.
+    Install `httpx[http2]` to multiplex concurrent requests over HTTP/2.
 
 Environment Variables:
     OPENAI_API_KEY - your OpenAI API key
     OUTPUT_PATH    - optional default output directory
+    OPENAI_RPM     - optional requests-per-minute budget (default 500)
+    OPENAI_TPM     - optional tokens-per-minute budget (default 30000)
+    OPENAI_COMPLETION_TOKENS - completion tokens budgeted per call when max_tokens is unset (default 1000)
+    LLM_CACHE      - set to 0 to disable the response cache (default on)
+    LLM_CACHE_DIR  - response cache directory (default ~/.cache/fieldops-llm)
+    SEMANTIC_CACHE - set to 1 to reuse responses for near-duplicate prompts (default off)
 
 Usage (CLI):
     python submit_prompt.py --prompt "A robot painting a sunset" --output-type image
@@ -20,43 +27,321 @@ Usage (CLI):
 Usage (imported):
     from submit_prompt import submit_prompt
     files = submit_prompt("Describe gravity", "text", "./out")
+
+    from submit_prompt import run_chat_prompt_async
+    text = await run_chat_prompt_async("Describe gravity", system_prompt="Be brief.")
 """
 
 import os
 import json
-import uuid
+import time
+import hashlib
+import shutil
+import asyncio
 import argparse
-import datetime
+import functools
+import threading
+import importlib.util
+import httpx
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from collections import OrderedDict
 from typing import List, Optional
 
 import openai
 
+from semantic_cache import SemanticCache
+
+try:
+    import tiktoken
+except ImportError:  # optional; token counts fall back to a chars/4 estimate
+    tiktoken = None
+
 # ---------------------- Environment & Client ---------------------- #
 api_key = os.getenv("OPENAI_API_KEY")
 if not api_key:
     raise EnvironmentError("OPENAI_API_KEY environment variable is not set.")
 
-client = openai.OpenAI(api_key=api_key)
+# The SDK retries 429s and 5xx with exponential backoff (honoring Retry-After)
+MAX_RETRIES = 6
+
+# HTTP/2 multiplexes concurrent completions over a few connections; it needs the h2 package
+HTTP2 = importlib.util.find_spec("h2") is not None
+HTTP_LIMITS = httpx.Limits(max_connections=64, max_keepalive_connections=32)
+
+client = openai.OpenAI(
+    api_key=api_key,
+    max_retries=MAX_RETRIES,
+    http_client=openai.DefaultHttpxClient(http2=HTTP2, limits=HTTP_LIMITS),
+)
+async_client = openai.AsyncOpenAI(
+    api_key=api_key,
+    max_retries=MAX_RETRIES,
+    http_client=openai.DefaultAsyncHttpxClient(http2=HTTP2, limits=HTTP_LIMITS),
+)
+
+# ---------------------- Rate Limiting ---------------------- #
+class RateLimiter:
+    """Token bucket that paces calls against requests/min and tokens/min budgets.
+
+    Each call reserves capacity up front and then waits out any deficit, so
+    concurrent callers queue in arrival order instead of bursting into 429s.
+    Thread-safe; usable from both sync and async code.
+    """
+
+    def __init__(self, requests_per_min: float, tokens_per_min: float):
+        self.requests_per_min = requests_per_min
+        self.tokens_per_min = tokens_per_min
+        self._requests = requests_per_min
+        self._tokens = tokens_per_min
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self, est_tokens: int) -> float:
+        """Reserve capacity for one call and return the seconds to wait before sending it."""
+        with self._lock:
+            now = time.monotonic()
+            elapsed = now - self._updated
+            self._updated = now
+            self._requests = min(self.requests_per_min, self._requests + elapsed * self.requests_per_min / 60)
+            self._tokens = min(self.tokens_per_min, self._tokens + elapsed * self.tokens_per_min / 60)
+
+            self._requests -= 1
+            self._tokens -= min(est_tokens, self.tokens_per_min)
+            return max(
+                0.0,
+                -self._requests * 60 / self.requests_per_min,
+                -self._tokens * 60 / self.tokens_per_min,
+            )
+
+    def acquire(self, est_tokens: int = 0) -> None:
+        time.sleep(self._reserve(est_tokens))
+
+    async def acquire_async(self, est_tokens: int = 0) -> None:
+        await asyncio.sleep(self._reserve(est_tokens))
+
+limiter = RateLimiter(
+    requests_per_min=float(os.getenv("OPENAI_RPM", "500")),
+    tokens_per_min=float(os.getenv("OPENAI_TPM", "30000")),
+)
+
+# TPM counts completion tokens too; reserve this many per call unless max_tokens caps it
+COMPLETION_TOKENS = int(os.getenv("OPENAI_COMPLETION_TOKENS", "1000"))
+
+# ---------------------- Response Cache ---------------------- #
+class LLMCache:
+    """Exact-match cache for deterministic chat completions.
+
+    Entries are keyed by a SHA-256 of (model, messages, temperature, max_tokens) and stored as
+    one JSON file per key, expiring after `ttl` seconds. Recently used entries are
+    also kept in memory so repeats within a run skip the disk. Async callers use
+    get_async/set_async, which do the file I/O in a worker thread.
+    """
+
+    def __init__(self, directory: str, ttl: int = 86400 * 30, memory_size: int = 4096):
+        self.directory = os.path.expanduser(directory)
+        self.ttl = ttl
+        self.memory_size = memory_size
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(model: str, messages: List[dict], temperature: Optional[float], max_tokens: Optional[int] = None) -> str:
+        request = {"model": model, "messages": messages, "temperature": temperature}
+        if max_tokens is not None:  # omitted when unset so existing keys stay valid
+            request["max_tokens"] = max_tokens
+        payload = json.dumps(
+            request,
+            sort_keys=True,
+            ensure_ascii=False,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def _remember(self, key: str, value: dict) -> None:
+        with self._lock:
+            self._memory[key] = value
+            self._memory.move_to_end(key)
+            if len(self._memory) > self.memory_size:
+                self._memory.popitem(last=False)
+
+    def _get_memory(self, key: str) -> Optional[dict]:
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                return self._memory[key]
+        return None
+
+    def get(self, key: str) -> Optional[dict]:
+        value = self._get_memory(key)
+        return value if value is not None else self._read(key)
+
+    async def get_async(self, key: str) -> Optional[dict]:
+        """get() for async callers: memory hits return inline, disk reads run in a thread."""
+        value = self._get_memory(key)
+        return value if value is not None else await asyncio.to_thread(self._read, key)
+
+    def _read(self, key: str) -> Optional[dict]:
+        path = self._path(key)
+        try:
+            if time.time() - os.path.getmtime(path) > self.ttl:
+                return None
+            with open(path, "r", encoding="utf-8") as f:
+                value = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        self._remember(key, value)
+        return value
+
+    def set(self, key: str, value: dict) -> None:
+        self._remember(key, value)
+        self._write(key, value)
+
+    async def set_async(self, key: str, value: dict) -> None:
+        self._remember(key, value)
+        await asyncio.to_thread(self._write, key, value)
+
+    def _write(self, key: str, value: dict) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        # Write then rename so concurrent readers never see a partial file
+        tmp_path = f"{self._path(key)}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(value, f, ensure_ascii=False)
+        os.replace(tmp_path, self._path(key))
+
+cache = None
+if os.getenv("LLM_CACHE", "1") != "0":
+    cache = LLMCache(os.getenv("LLM_CACHE_DIR", "~/.cache/fieldops-llm"))
+
+EMBEDDING_MODEL = "text-embedding-3-small"
+
+semantic_cache = None
+if os.getenv("SEMANTIC_CACHE") == "1":
+    semantic_cache = SemanticCache(path=".semcache", threshold=0.92)
+
+# Shared HTTP session so image downloads reuse TCP/TLS connections
+http_session = requests.Session()
+http_session.mount(
+    "https://",
+    HTTPAdapter(pool_connections=32, pool_maxsize=32, max_retries=Retry(total=3, backoff_factor=0.3)),
+)
 
 # ---------------------- Helpers ---------------------- #
 def unique_basename() -> str:
-    timestamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
-    return f"response_{timestamp}_{uuid.uuid4().hex[:6]}"
+    # Nanosecond clock plus 32 random bits: unique even for concurrent calls in one tick
+    return f"response_{time.time_ns():x}_{os.urandom(4).hex()}"
+
+@functools.lru_cache(maxsize=None)
+def _encoding_for(model: str):
+    """tiktoken encoding for `model`, or None if unknown or unavailable.
+
+    encoding_for_model downloads its BPE file on first use, so offline or behind a
+    proxy it raises network errors rather than KeyError. A failure is cached too,
+    so later calls don't wait on the same download again.
+    """
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model)
+    except Exception:
+        return None
+
+def estimate_tokens(messages: List[dict], model: str) -> int:
+    """Count prompt tokens with tiktoken when available, else estimate at ~4 chars/token."""
+    text = "".join(m["content"] for m in messages)
+    encoding = _encoding_for(model)
+    if encoding is not None:
+        return len(encoding.encode(text))
+    return len(text) // 4
+
+def build_messages(prompt: str, system_prompt: Optional[str] = None) -> List[dict]:
+    messages = []
+    if system_prompt:
+        messages.append({"role": "system", "content": system_prompt})
+    messages.append({"role": "user", "content": prompt})
+    return messages
+
+def _cache_key(model: str, messages: List[dict], temperature: Optional[float], max_tokens: Optional[int]) -> Optional[str]:
+    """Return a cache key for deterministic calls (temperature unset or 0), else None."""
+    if cache is None or temperature not in (None, 0):
+        return None
+    return LLMCache.key(model, messages, temperature, max_tokens)
+
+def _request_kwargs(temperature: Optional[float], max_tokens: Optional[int]) -> dict:
+    kwargs = {} if temperature is None else {"temperature": temperature}
+    if max_tokens is not None:
+        kwargs["max_completion_tokens"] = max_tokens
+    return kwargs
+
+def _budget_tokens(messages: List[dict], model: str, max_tokens: Optional[int]) -> int:
+    """Tokens to reserve with the rate limiter: the prompt plus the expected completion."""
+    return estimate_tokens(messages, model) + (max_tokens or COMPLETION_TOKENS)
 
-def save_json(filepath: str, data: dict) -> None:
+def chat_completion(messages: List[dict], model: str, temperature: Optional[float] = None, max_tokens: Optional[int] = None) -> dict:
+    """Create a chat completion through the cache and rate limiter. Returns the response as a dict."""
+    key = _cache_key(model, messages, temperature, max_tokens)
+    if key and (cached := cache.get(key)) is not None:
+        return cached
+
+    if semantic_cache:
+        text = "\n\n".join(m["content"] for m in messages)
+        embedding = client.embeddings.create(model=EMBEDDING_MODEL, input=text).data[0].embedding
+        if (similar := semantic_cache.lookup(embedding, model)) is not None:
+            return similar
+
+    kwargs = _request_kwargs(temperature, max_tokens)
+    limiter.acquire(_budget_tokens(messages, model, max_tokens))
+    response = client.chat.completions.create(model=model, messages=messages, **kwargs).model_dump()
+
+    if key:
+        cache.set(key, response)
+    if semantic_cache:
+        semantic_cache.add(embedding, model, response)
+    return response
+
+async def chat_completion_async(messages: List[dict], model: str, temperature: Optional[float] = None, max_tokens: Optional[int] = None) -> dict:
+    """Async counterpart of chat_completion."""
+    key = _cache_key(model, messages, temperature, max_tokens)
+    if key and (cached := await cache.get_async(key)) is not None:
+        return cached
+
+    if semantic_cache:
+        text = "\n\n".join(m["content"] for m in messages)
+        embedding = (await async_client.embeddings.create(model=EMBEDDING_MODEL, input=text)).data[0].embedding
+        # The scan is CPU-bound; keep it off the event loop so other requests proceed
+        if (similar := await asyncio.to_thread(semantic_cache.lookup, embedding, model)) is not None:
+            return similar
+
+    kwargs = _request_kwargs(temperature, max_tokens)
+    await limiter.acquire_async(_budget_tokens(messages, model, max_tokens))
+    response = (await async_client.chat.completions.create(model=model, messages=messages, **kwargs)).model_dump()
+
+    if key:
+        await cache.set_async(key, response)
+    if semantic_cache:
+        await asyncio.to_thread(semantic_cache.add, embedding, model, response)
+    return response
+
+def save_json(filepath: str, data: dict, indent: Optional[int] = None) -> None:
+    """Write compact JSON; pass indent for a human-readable file."""
+    separators = None if indent else (",", ":")
     with open(filepath, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2)
+        json.dump(data, f, ensure_ascii=False, indent=indent, separators=separators)
 
 def save_text(filepath: str, text: str) -> None:
     with open(filepath, "w", encoding="utf-8") as f:
         f.write(text)
 
 def save_image_from_url(url: str, filepath: str) -> None:
-    response = requests.get(url)
-    response.raise_for_status()
-    with open(filepath, "wb") as f:
-        f.write(response.content)
+    with http_session.get(url, stream=True, timeout=30) as response:
+        response.raise_for_status()
+        response.raw.decode_content = True
+        with open(filepath, "wb") as f:
+            shutil.copyfileobj(response.raw, f, length=1 << 20)
 
 # ---------------------- Main Callable ---------------------- #
 def submit_prompt(prompt: str, output_type: str, output_path: Optional[str] = None) -> List[str]:
@@ -79,15 +364,12 @@ def submit_prompt(prompt: str, output_type: str, output_path: Optional[str] = No
 
     try:
         if output_type == "text":
-            response = client.chat.completions.create(
-                model="gpt-4",
-                messages=[{"role": "user", "content": prompt}]
-            )
-            content = response.choices[0].message.content
+            response = chat_completion(build_messages(prompt), model="gpt-4")
+            content = response["choices"][0]["message"]["content"]
             text_filepath = os.path.join(output_dir, f"{basename}.txt")
             save_text(text_filepath, content)
             written_files.append(text_filepath)
-            save_json(json_filepath, response.model_dump())
+            save_json(json_filepath, response)
             written_files.append(json_filepath)
 
         elif output_type == "image":
@@ -117,19 +399,15 @@ def submit_prompt(prompt: str, output_type: str, output_path: Optional[str] = No
 
     return written_files
 
-def run_chat_prompt(prompt: str, system_prompt: Optional[str] = None, model: str = "gpt-4o") -> str:
+def run_chat_prompt(prompt: str, system_prompt: Optional[str] = None, model: str = "gpt-4o", temperature: Optional[float] = None, max_tokens: Optional[int] = None) -> str:
     """Run a ChatCompletion with optional system prompt. Returns response text only."""
-    messages = []
-    if system_prompt:
-        messages.append({"role": "system", "content": system_prompt})
-    messages.append({"role": "user", "content": prompt})
-
-    response = client.chat.completions.create(
-        model=model,
-        messages=messages
-    )
+    response = chat_completion(build_messages(prompt, system_prompt), model, temperature, max_tokens)
+    return response["choices"][0]["message"]["content"].strip()
 
-    return response.choices[0].message.content.strip()
+async def run_chat_prompt_async(prompt: str, system_prompt: Optional[str] = None, model: str = "gpt-4o", temperature: Optional[float] = None, max_tokens: Optional[int] = None) -> str:
+    """Async counterpart of run_chat_prompt for running many prompts concurrently."""
+    response = await chat_completion_async(build_messages(prompt, system_prompt), model, temperature, max_tokens)
+    return response["choices"][0]["message"]["content"].strip()
 
 # ---------------------- CLI Entry ---------------------- #
 if __name__ == "__main__":
@@ -0,0 +1,150 @@
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "python"))
+
+import asyncio
+
+import pytest
+
+
+@pytest.fixture
+def compose(monkeypatch):
+    # submit_prompt needs a key at import; no request is ever sent
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    monkeypatch.setenv("LLM_CACHE", "0")
+    import compose
+    return compose
+
+
+def old_slugify(text):
+    return text.lower().replace(" ", "_").replace(",", "").replace(":", "").replace("-", "_")
+
+
+@pytest.mark.parametrize("text", ["Nurse", "Data Scientist", "on-call: triage, nights", "A-B C"])
+def test_slugify_ascii_matches_replace_chain(compose, text):
+    assert compose.slugify(text) == old_slugify(text)
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("Café", "cafe"),
+    ("Crème Brûlée", "creme_brulee"),
+    ("日本", "日本"),
+    ("Врач", "врач"),
+    ("한국 의사", "한국_의사"),
+])
+def test_slugify_keeps_non_latin_scripts(compose, text, expected):
+    assert compose.slugify(text) == expected
+
+
+WORKFLOW_YAML = """
+- name: intro
+  prompt: "Open for {input}, building on {r:summary}"
+- name: summary
+  prompt: "Summarize {activity} for a {profession}"
+- name: outline
+  prompt: "Outline {activity} for a {profession}"
+- name: final
+  prompt: "Rewrite {r:outline} as someone feeling {feeling}"
+"""
+
+
+@pytest.fixture
+def echo_chat(compose, monkeypatch):
+    """Stub the model: reply with the prompt in brackets and record every prompt sent."""
+    prompts = []
+
+    async def run_chat_prompt_async(prompt, system_prompt=None):
+        prompts.append(prompt)
+        return f"<{prompt}>"
+
+    monkeypatch.setattr(compose, "run_chat_prompt_async", run_chat_prompt_async)
+    monkeypatch.setattr(compose, "FUSE_WORKFLOW", False)
+    return prompts
+
+
+def run_contexts(compose, contexts, workflow, outer_results):
+    async def run():
+        semaphore = asyncio.Semaphore(4)
+        return await asyncio.gather(
+            *(compose.run_workflow(context, workflow, semaphore, outer_results) for context in contexts)
+        )
+
+    return asyncio.run(run())
+
+
+def test_outer_steps_run_once_per_pair(compose, echo_chat, tmp_path):
+    (tmp_path / "workflow.yaml").write_text(WORKFLOW_YAML)
+    workflow = compose.load_workflow(str(tmp_path / "workflow.yaml"))
+    contexts = compose.build_contexts({"nurse": ["triage", "rounds"]}, {"negative": ["anxious", "tired"]})
+
+    shared = run_contexts(compose, contexts, workflow, outer_results={})
+    outline_prompts = [p for p in echo_chat if p.startswith("Outline")]
+    assert sorted(outline_prompts) == ["Outline rounds for a nurse", "Outline triage for a nurse"]
+
+    # Same responses as running every step in order for every context
+    echo_chat.clear()
+    in_order = run_contexts(compose, contexts, workflow, outer_results=None)
+    assert shared == in_order
+    assert len([p for p in echo_chat if p.startswith("Outline")]) == len(contexts)
+
+
+def test_forward_reference_stays_inner(compose, echo_chat, tmp_path):
+    (tmp_path / "workflow.yaml").write_text(WORKFLOW_YAML)
+    workflow = compose.load_workflow(str(tmp_path / "workflow.yaml"))
+
+    outer, inner = compose.partition_workflow(workflow)
+    assert [step["name"] for step in outer] == ["outline"]
+    assert [step["name"] for step in inner] == ["intro", "summary", "final"]
+
+    contexts = compose.build_contexts({"nurse": ["triage"]}, {"negative": ["anxious", "tired"]})
+    results = run_contexts(compose, contexts, workflow, outer_results={})
+    for responses in results:
+        assert responses["intro"].endswith("building on [MISSING:summary]>")
+    assert len([p for p in echo_chat if p.startswith("Summarize")]) == len(contexts)
+
+
+def test_responses_keep_workflow_order(compose, echo_chat, tmp_path):
+    (tmp_path / "workflow.yaml").write_text(WORKFLOW_YAML)
+    workflow = compose.load_workflow(str(tmp_path / "workflow.yaml"))
+    contexts = compose.build_contexts({"nurse": ["triage"]}, {"negative": ["anxious"]})
+
+    (responses,) = run_contexts(compose, contexts, workflow, outer_results={})
+    assert list(responses) == ["intro", "summary", "outline", "final"]
+    assert echo_chat[0] == "Outline triage for a nurse"  # the outer step ran first
+
+
+def test_concat_templates_keeps_segment_alternation(compose):
+    fused = compose.concat_templates(
+        compose.compile_template("x {a} y"), "mid ", compose.compile_template("{b} z {c}")
+    )
+    assert fused == ["x ", "a", " ymid ", "b", " z ", "c", ""]
+    assert fused[1::2] == ["a", "b", "c"]  # tokens stay at odd indexes
+    assert compose.substitute_prompt_template(fused, {"a": "1", "b": "2", "c": "3"}, {}) == "x 1 ymid 2 z 3"
+
+
+def test_fuse_workflow_skips_empty_system_prompts(compose):
+    workflow = [
+        {"name": "one", "system": compose.compile_template(""), "prompt": compose.compile_template("P1 {input}")},
+        {"name": "two", "system": compose.compile_template("Be {feeling}."), "prompt": compose.compile_template("P2")},
+        {"name": "three", "system": compose.compile_template("Be brief."), "prompt": compose.compile_template("P3")},
+    ]
+    fused = compose.fuse_workflow(workflow)
+    context = {"input": "IN", "feeling": "calm"}
+
+    assert compose.substitute_prompt_template(fused["system"], context, {}) == "Be calm.\n\nBe brief."
+    prompt = compose.substitute_prompt_template(fused["prompt"], context, {})
+    assert "===SECTION:one===\nP1 IN\n\n===SECTION:two===\nP2\n\n===SECTION:three===\nP3" in prompt
+
+
+def test_split_sections(compose):
+    workflow = [{"name": "a"}, {"name": "b"}, {"name": "c"}]
+    reply = (
+        "===SECTION:a===   \nAlpha, see (your ===SECTION:c=== section above)\n\nmore\n"
+        "===SECTION:b=== Beta on the marker line\n"
+    )
+
+    assert compose.split_sections(reply, workflow) == {
+        "a": "Alpha, see (your ===SECTION:c=== section above)\n\nmore",
+        "b": "Beta on the marker line",
+        "c": "[MISSING:c]",
+    }
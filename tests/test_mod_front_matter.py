@@ -13,6 +13,7 @@ sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "python"))
 import pytest
 import frontmatter
 import shutil
+import yaml
 from datetime import datetime
 
 import mod_front_matter
@@ -73,3 +74,60 @@ def test_override_and_backup(temp_md_file):
     assert modified["draft"] is False
     assert modified["pageTitle"] == "Updated Title"
 
+
+@pytest.mark.parametrize("value", [
+    "true", "False", "TRUE", "0", "42", "-7", "+3", "012", "1.5",
+    "\"quoted\"", "'single'", "\"it's\"", "'say \"hi\"'", "\"esc\\tape\"",
+    "yes", "null", "Updated Title", "[a, b]", "2024-01-01",
+])
+def test_parse_value_matches_yaml(value):
+    assert mod_front_matter.parse_value(value) == yaml.safe_load(value)
+
+def test_process_astro_file(tmp_path):
+    md = tmp_path / "post.md"
+    md.write_text("---\npageTitle: Hi\nlayout: blog\n---\n\nBody\n")
+
+    mod_front_matter.process_one(md, [("draft", "true")])
+
+    post = frontmatter.load(md)
+    assert post.metadata == {"pageTitle": "Hi", "layout": "blog", "draft": True}
+    assert post.content == "Body"
+
+def test_directory_batch(tmp_path, monkeypatch):
+    (tmp_path / "posts").mkdir()
+    for name in ("a.md", "posts/b.md"):
+        (tmp_path / name).write_text("---\ntitle: Post\nauthor: David\n---\n\nBody\n")
+    # Already-converted posts are the common case when re-running over a migrated site
+    (tmp_path / "posts/c.md").write_text("---\npageTitle: Astro\nlayout: blog\n---\n\nAstro body\n")
+    # A backup left by an earlier run must not be processed again
+    (tmp_path / "mfm_20240101000000_a.md").write_text("---\ntitle: Old\n---\n")
+
+    monkeypatch.setattr(sys, "argv", ["mod_front_matter.py", str(tmp_path), "--set", "draft=false"])
+    mod_front_matter.main()
+
+    for name in ("a.md", "posts/b.md"):
+        post = frontmatter.load(tmp_path / name)
+        assert post["layout"] == "blog"
+        assert post["pageTitle"] == "Post"
+        assert post["draft"] is False
+        assert post.content == "Body"
+    astro = frontmatter.load(tmp_path / "posts/c.md")
+    assert astro.metadata == {"pageTitle": "Astro", "layout": "blog", "draft": False}
+    assert astro.content == "Astro body"
+    assert frontmatter.load(tmp_path / "mfm_20240101000000_a.md").metadata == {"title": "Old"}
+    assert len(list(tmp_path.rglob("mfm_*.md"))) == 4
+
+def test_directory_batch_reports_failures(tmp_path, monkeypatch, capsys):
+    (tmp_path / "good.md").write_text("---\ntitle: Post\nauthor: David\n---\n\nBody\n")
+    (tmp_path / "bad.md").write_text("---\ntitle: [unclosed\n---\n\nBody\n")
+
+    monkeypatch.setattr(sys, "argv", ["mod_front_matter.py", str(tmp_path)])
+    with pytest.raises(SystemExit) as exit_info:
+        mod_front_matter.main()
+
+    assert exit_info.value.code == 1
+    assert frontmatter.load(tmp_path / "good.md")["pageTitle"] == "Post"
+    out, err = capsys.readouterr()
+    assert f"{tmp_path / 'good.md'}: converted to AstroLaunch UI front matter." in out
+    assert "Updated 1 of 2 files." in out
+    assert f"Failed: {tmp_path / 'bad.md'}:" in err
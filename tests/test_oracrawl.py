@@ -0,0 +1,76 @@
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "python"))
+
+import pytest
+import sqlglot
+from sqlglot.expressions import Table, Func
+
+import oracrawl
+
+
+def parse_one_objects(sql):
+    """The extraction as it was before the token fast path: a plain parse_one walk."""
+    parsed = sqlglot.parse_one(sql, dialect="oracle")
+    tables = {oracrawl.strip_alias(n.sql(dialect="oracle")) for n in parsed.find_all(Table)}
+    functions = {
+        n.sql_name().upper(): "UDF"
+        for n in parsed.find_all(Func)
+        if oracrawl.classify_function(n.sql_name()) == "UDF"
+    }
+    return tuple(sorted(tables)), functions
+
+
+@pytest.mark.parametrize("sql", [
+    "SELECT a, b FROM hr.employees",
+    "SELECT e.id, d.name FROM hr.employees e JOIN hr.departments d ON e.dept_id = d.id",
+    "SELECT * FROM sales.orders o LEFT OUTER JOIN sales.customers c ON o.cust = c.id WHERE o.status = 'OPEN'",
+    "SELECT x.a FROM t1 x, t2 y, t3 WHERE x.id = y.id ORDER BY x.a DESC",
+    'SELECT "Mixed"."Col" FROM "Mixed" CROSS JOIN other_table',
+    "SELECT DISTINCT a || b AS ab FROM t WHERE c IS NOT NULL GROUP BY a, b",
+])
+def test_token_scan_matches_parser(sql):
+    fast = oracrawl._extract_from_tokens(oracrawl.ORACLE.tokenize(sql))
+    assert fast is not None
+    assert fast == oracrawl._extract_with_parser(sql)
+
+
+@pytest.mark.parametrize("sql", [
+    "SELECT NVL(a, 0), my_fn(b) FROM t",
+    "SELECT CASE WHEN a = 1 THEN 2 END FROM t",
+    "SELECT sysdate FROM dual",
+    "SELECT a FROM t WHERE a = 1 AND b = 2",
+    "SELECT a FROM (SELECT a FROM t)",
+    "WITH x AS (SELECT a FROM t) SELECT a FROM x",
+    "SELECT e.id, NVL(e.bonus, 0) AS bonus, CASE WHEN d.region = 'EU' THEN 'Y' ELSE 'N' END AS eu "
+    "FROM hr.employees e JOIN hr.departments d ON e.dept_id = d.id AND d.active = 'Y' "
+    "WHERE e.hired > :cutoff",
+])
+def test_fallback_reusing_tokens_matches_parser(sql):
+    assert oracrawl._extract_from_tokens(oracrawl.ORACLE.tokenize(sql)) is None
+    result = oracrawl.extract_objects_from_sql(sql)
+    assert result == oracrawl._extract_with_parser(sql)
+    assert result == parse_one_objects(sql)
+
+
+class RecordingPool:
+    def __init__(self):
+        self.batches = []
+
+    def map(self, fn, items):
+        self.batches.append(list(items))
+        return map(fn, items)
+
+
+def test_parse_view_ddls_parses_each_ddl_once(monkeypatch):
+    monkeypatch.setattr(oracrawl, "parsed_ddls", {})
+    pool = RecordingPool()
+    ddls = [f"SELECT a FROM t{i}" for i in range(oracrawl.PARALLEL_PARSE_MIN)]
+
+    first = oracrawl.parse_view_ddls(ddls + ddls, pool)
+    assert pool.batches == [sorted(ddls)]
+    assert first[0] == first[len(ddls)] == (("t0",), {})
+
+    second = oracrawl.parse_view_ddls(ddls + ["SELECT b FROM t9"], pool)
+    assert len(pool.batches) == 1
+    assert second[-1] == (("t9",), {})
@@ -0,0 +1,74 @@
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "python"))
+
+import pytest
+
+import semantic_cache
+from semantic_cache import SemanticCache
+
+
+@pytest.fixture(params=["numpy", "python"], autouse=True)
+def backend(request, monkeypatch):
+    """Run every test against the numpy matrix and the pure-Python scan."""
+    if request.param == "numpy":
+        monkeypatch.setattr(semantic_cache, "np", pytest.importorskip("numpy"))
+    else:
+        monkeypatch.setattr(semantic_cache, "np", None)
+    return request.param
+
+
+def test_hit_above_threshold_and_miss_below(tmp_path):
+    cache = SemanticCache(str(tmp_path), threshold=0.92)
+    cache.add([1.0, 0.0, 0.0], "gpt-4o", {"text": "x"})
+
+    assert cache.lookup([1.0, 0.1, 0.0], "gpt-4o") == {"text": "x"}  # cos ~0.995
+    assert cache.lookup([1.0, 1.0, 0.0], "gpt-4o") is None  # cos ~0.707
+
+
+def test_other_model_misses(tmp_path):
+    cache = SemanticCache(str(tmp_path))
+    cache.add([1.0, 0.0, 0.0], "gpt-4o", {"text": "x"})
+
+    assert cache.lookup([1.0, 0.0, 0.0], "gpt-4o-mini") is None
+    cache.add([0.0, 1.0, 0.0], "gpt-4o-mini", {"text": "y"})
+    assert cache.lookup([1.0, 0.0, 0.0], "gpt-4o-mini") is None
+
+
+def test_oldest_entry_evicted_at_max_entries(tmp_path):
+    cache = SemanticCache(str(tmp_path), max_entries=2)
+    for i, vector in enumerate([[1.0, 0.0, 0.0], [0.0, 1.0, 0.0], [0.0, 0.0, 1.0]]):
+        cache.add(vector, "gpt-4o", {"i": i})
+
+    assert cache.lookup([1.0, 0.0, 0.0], "gpt-4o") is None
+    assert cache.lookup([0.0, 1.0, 0.0], "gpt-4o") == {"i": 1}
+    assert cache.lookup([0.0, 0.0, 1.0], "gpt-4o") == {"i": 2}
+
+
+def test_wrong_dimension_is_ignored(tmp_path):
+    cache = SemanticCache(str(tmp_path))
+    cache.add([1.0, 0.0, 0.0], "gpt-4o", {"text": "x"})
+    cache.add([1.0, 0.0, 0.0, 0.0], "gpt-4o", {"text": "4d"})
+
+    assert cache.lookup([1.0, 0.0, 0.0, 0.0], "gpt-4o") is None
+    assert cache.lookup([1.0, 0.0, 0.0], "gpt-4o") == {"text": "x"}
+    assert len((tmp_path / "entries.jsonl").read_text().splitlines()) == 1
+
+
+def test_reload_keeps_newest_and_compacts(tmp_path):
+    cache = SemanticCache(str(tmp_path), max_entries=2)
+    vectors = [[1.0, 0.0, 0.0], [0.0, 1.0, 0.0], [0.0, 0.0, 1.0], [1.0, 1.0, 0.0], [0.0, 1.0, 1.0]]
+    for i, vector in enumerate(vectors):
+        cache.add(vector, "gpt-4o", {"i": i})
+    entries = tmp_path / "entries.jsonl"
+    assert len(entries.read_text().splitlines()) == 5
+
+    reloaded = SemanticCache(str(tmp_path), max_entries=2)
+    assert reloaded.lookup(vectors[3], "gpt-4o") == {"i": 3}
+    assert reloaded.lookup(vectors[4], "gpt-4o") == {"i": 4}
+    assert reloaded.lookup(vectors[0], "gpt-4o") is None
+    # More than twice max_entries lines on disk, so the file was rewritten to the kept entries
+    assert len(entries.read_text().splitlines()) == 2
+
+    again = SemanticCache(str(tmp_path), max_entries=2)
+    assert again.lookup(vectors[4], "gpt-4o") == {"i": 4}
@@ -0,0 +1,58 @@
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "python"))
+
+import types
+import asyncio
+import threading
+
+import pytest
+
+
+@pytest.fixture
+def submit_prompt(monkeypatch):
+    # The module needs a key at import; no request is ever sent
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    monkeypatch.setenv("LLM_CACHE", "0")
+    import submit_prompt
+    submit_prompt._encoding_for.cache_clear()
+    yield submit_prompt
+    submit_prompt._encoding_for.cache_clear()
+
+
+def test_estimate_tokens_falls_back_when_tiktoken_cannot_download(submit_prompt, monkeypatch):
+    calls = []
+
+    def encoding_for_model(model):
+        calls.append(model)
+        raise ConnectionError("offline")
+
+    monkeypatch.setattr(submit_prompt, "tiktoken", types.SimpleNamespace(encoding_for_model=encoding_for_model))
+    messages = [{"role": "user", "content": "x" * 40}]
+
+    assert submit_prompt.estimate_tokens(messages, "gpt-4o") == 10
+    assert submit_prompt.estimate_tokens(messages, "gpt-4o") == 10
+    assert calls == ["gpt-4o"]
+
+
+def test_llm_cache_async_reads_disk_off_the_loop(submit_prompt, tmp_path, monkeypatch):
+    key = submit_prompt.LLMCache.key("gpt-4o", [{"role": "user", "content": "hi"}], None)
+    read_threads = []
+    read = submit_prompt.LLMCache._read
+
+    def recording_read(self, key):
+        read_threads.append(threading.get_ident())
+        return read(self, key)
+
+    monkeypatch.setattr(submit_prompt.LLMCache, "_read", recording_read)
+
+    async def roundtrip():
+        await submit_prompt.LLMCache(str(tmp_path)).set_async(key, {"text": "hello"})
+        fresh = submit_prompt.LLMCache(str(tmp_path))
+        first = await fresh.get_async(key)  # from disk
+        second = await fresh.get_async(key)  # from memory
+        return first, second, threading.get_ident()
+
+    first, second, loop_thread = asyncio.run(roundtrip())
+    assert first == second == {"text": "hello"}
+    assert len(read_threads) == 1 and read_threads[0] != loop_thread